@@ -1,9 +1,11 @@
 
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 DB_FILE = "lpc_character_generator.sqlite"
 ASSETS_DIR = "spritesheets/"
+SCAN_WORKERS = 8  # threads walking top-level asset directories concurrently
 
 # Base schema (see previous message)
 SCHEMA = """
@@ -29,6 +31,8 @@ CREATE TABLE IF NOT EXISTS assets (
     FOREIGN KEY (layer_id) REFERENCES layers(id)
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS assets_np ON assets(name, file_path);
+
 CREATE TABLE IF NOT EXISTS asset_animations (
     asset_id INTEGER NOT NULL,
     animation_id INTEGER NOT NULL,
@@ -36,7 +40,7 @@ CREATE TABLE IF NOT EXISTS asset_animations (
     PRIMARY KEY (asset_id, animation_id),
     FOREIGN KEY (asset_id) REFERENCES assets(id),
     FOREIGN KEY (animation_id) REFERENCES animations(id)
-);
+) WITHOUT ROWID;
 
 CREATE TABLE IF NOT EXISTS palettes (
     id INTEGER PRIMARY KEY,
@@ -56,7 +60,7 @@ CREATE TABLE IF NOT EXISTS character_assets (
     PRIMARY KEY (character_id, asset_id),
     FOREIGN KEY (character_id) REFERENCES characters(id),
     FOREIGN KEY (asset_id) REFERENCES assets(id)
-);
+) WITHOUT ROWID;
 
 ALTER TABLE layers ADD COLUMN draw_order INTEGER;
 UPDATE layers SET draw_order = 
@@ -74,6 +78,34 @@ UPDATE layers SET draw_order =
 
 """
 
+# Write-optimized settings for the cold bulk load, and what to restore afterwards
+BULK_LOAD_PRAGMAS = """
+PRAGMA journal_mode=OFF;
+PRAGMA synchronous=OFF;
+PRAGMA temp_store=MEMORY;
+PRAGMA locking_mode=EXCLUSIVE;
+"""
+
+RESTORE_PRAGMAS = """
+PRAGMA locking_mode=NORMAL;
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+"""
+
+# Hot statements, defined once so sqlite3 reuses their compiled programs
+INSERT_ANIMATION_SQL = "INSERT OR IGNORE INTO animations (name, direction_count, frame_count) VALUES (?, ?, ?)"
+INSERT_LAYER_SQL = "INSERT OR IGNORE INTO layers (name, render_order) VALUES (?, ?)"
+INSERT_ASSET_SQL = "INSERT OR IGNORE INTO assets (name, layer_id, file_path) VALUES (?, ?, ?)"
+INSERT_TMP_ANIM_SQL = "INSERT INTO tmp_anim (name, path, anim_id) VALUES (?, ?, ?)"
+# Resolve asset ids inside SQLite rather than round-tripping them through Python
+LINK_ASSET_ANIMATIONS_SQL = """
+INSERT OR IGNORE INTO asset_animations (asset_id, animation_id, frame_path_template)
+SELECT a.id, t.anim_id, t.path
+FROM tmp_anim t
+JOIN assets a ON a.name = t.name AND a.file_path = t.path
+"""
+STATEMENT_CACHE_SIZE = 256
+
 # Known animations (can be extended)
 ANIMATIONS = {
     "walk": (4, 9),
@@ -90,99 +122,146 @@ LAYER_ORDER = [
 ]
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    # Autocommit mode: every transaction below is opened and closed explicitly
+    conn = sqlite3.connect(DB_FILE, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE)
     cur = conn.cursor()
+    cur.executescript(BULK_LOAD_PRAGMAS)
     cur.executescript(SCHEMA)
 
+    conn.execute("BEGIN TRANSACTION")
     # Insert animations
-    for name, (dirs, frames) in ANIMATIONS.items():
-        cur.execute("INSERT OR IGNORE INTO animations (name, direction_count, frame_count) VALUES (?, ?, ?)",
-                    (name, dirs, frames))
+    cur.executemany(INSERT_ANIMATION_SQL,
+                    [(name, dirs, frames) for name, (dirs, frames) in ANIMATIONS.items()])
 
     # Insert layers
-    for i, layer in enumerate(LAYER_ORDER):
-        cur.execute("INSERT OR IGNORE INTO layers (name, render_order) VALUES (?, ?)", (layer, i))
-
-    conn.commit()
+    cur.executemany(INSERT_LAYER_SQL, [(layer, i) for i, layer in enumerate(LAYER_ORDER)])
+    conn.execute("COMMIT")
     return conn, cur
 
-def find_layer(name):
-    for i, layer in enumerate(LAYER_ORDER):
-        if layer in name.lower():
-            return layer
-    return None
-
-def scan_assets(conn, cur):
-    print("📁 Scanning assets...")
+def iter_files(root):
+    """Recursively yield (path, name) for every file under root using os.scandir."""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return  # skip unreadable or vanished directories, as os.walk does
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_files(entry.path)
+        elif entry.is_file():
+            yield entry.path, entry.name
+
+def classify_files(files, layer_ids, anim_ids):
+    """Classify (path, name) pairs into asset rows and asset-animation rows.
+
+    Runs inside scan worker threads, so it only touches its own lists.
+    """
+    file_count = 0
     asset_entries = []
     animation_entries = []
+    asset_cache = set()
+    # os.scandir paths all start with ASSETS_DIR plus a separator, so slicing
+    # gives the relative path without os.path.relpath's per-call normalization
+    prefix_len = len(os.path.join(ASSETS_DIR, ""))
 
-    # Cache layer and animation IDs
-    cur.execute("SELECT id, name FROM layers")
-    layer_ids = {name: id for id, name in cur.fetchall()}
+    for path, file in files:
+        file_count += 1
 
-    cur.execute("SELECT id, name FROM animations")
-    anim_ids = {name: id for id, name in cur.fetchall()}
+        if not file.endswith(".png"):
+            continue
 
-    asset_cache = set()
+        rel_path = path[prefix_len:]
+        asset_name = os.path.splitext(file)[0]
+        # Lower-case once; the first name in list order wins, as before
+        low = rel_path.lower()
+        animation = next((a for a in anim_ids if a in low), None)
+        layer = next((l for l in LAYER_ORDER if l in low), None)
 
-    total_files = sum(len(files) for _, _, files in os.walk(ASSETS_DIR))
-    file_count = 0
+        if not animation or not layer:
+            continue
 
-    for root, _, files in os.walk(ASSETS_DIR):
-        for file in files:
-            file_count += 1
-            if file_count % 500 == 0:
-                print(f"🔍 Processed {file_count}/{total_files} files...")
+        layer_id = layer_ids[layer]
+        anim_id = anim_ids[animation]
 
-            if not file.endswith(".png"):
-                continue
+        key = (asset_name, rel_path)
+        if key not in asset_cache:
+            asset_entries.append((asset_name, layer_id, rel_path))
+            asset_cache.add(key)
 
-            rel_path = os.path.relpath(os.path.join(root, file), ASSETS_DIR)
-            asset_name = os.path.splitext(file)[0]
-            animation = next((a for a in anim_ids if a in rel_path.lower()), None)
-            layer = find_layer(rel_path)
+        animation_entries.append((asset_name, rel_path, anim_id))
 
-            if not animation or not layer:
-                continue
+    return file_count, asset_entries, animation_entries
 
-            layer_id = layer_ids[layer]
-            anim_id = anim_ids[animation]
+def scan_assets(conn, cur):
+    print("📁 Scanning assets...")
+    asset_entries = []
+    animation_entries = []
 
-            key = (asset_name, rel_path)
-            if key not in asset_cache:
-                asset_entries.append((asset_name, layer_id, rel_path))
-                asset_cache.add(key)
+    # Cache layer and animation IDs
+    cur.execute("SELECT id, name FROM layers")
+    layer_ids = {name: id for id, name in cur.fetchall()}
 
-            animation_entries.append((asset_name, rel_path, anim_id))
+    cur.execute("SELECT id, name FROM animations")
+    anim_ids = {name: id for id, name in cur.fetchall()}
 
-    print(f"🧱 Inserting {len(asset_entries)} unique assets...")
+    # Fan out one traversal per top-level directory; files sitting directly in
+    # ASSETS_DIR are classified on the main thread.
+    try:
+        with os.scandir(ASSETS_DIR) as it:
+            top_entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        # Like os.walk, treat an unreadable or missing root as empty
+        print(f"⚠️ Cannot read {ASSETS_DIR}: {e}")
+        top_entries = []
+    top_files = [(e.path, e.name) for e in top_entries
+                 if not e.is_dir(follow_symlinks=False) and e.is_file()]
+    top_dirs = [e.path for e in top_entries if e.is_dir(follow_symlinks=False)]
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        futures = [executor.submit(classify_files, iter_files(d), layer_ids, anim_ids)
+                   for d in top_dirs]
+        results = [classify_files(top_files, layer_ids, anim_ids)]
+        file_count = results[0][0]
+
+        # Report progress as each directory finishes ...
+        for future in as_completed(futures):
+            file_count += future.result()[0]
+            print(f"🔍 Processed {file_count} files...")
+
+        # ... but merge in submission order so the insert order is stable
+        results.extend(f.result() for f in futures)
+
+    for _, assets, animations in results:
+        asset_entries.extend(assets)
+        animation_entries.extend(animations)
+
+    # Assets and their animation links go in as one transaction
     conn.execute("BEGIN TRANSACTION")
-    for name, layer_id, path in asset_entries:
-        cur.execute("INSERT OR IGNORE INTO assets (name, layer_id, file_path) VALUES (?, ?, ?)",
-                    (name, layer_id, path))
-    conn.execute("COMMIT")
-
-    print("📥 Fetching asset IDs...")
-    cur.execute("SELECT id, name, file_path FROM assets")
-    asset_id_map = {(name, path): id for id, name, path in cur.fetchall()}
+    print(f"🧱 Inserting {len(asset_entries)} unique assets...")
+    cur.executemany(INSERT_ASSET_SQL, asset_entries)
 
     print(f"🎞 Linking {len(animation_entries)} asset-animation pairs...")
-    conn.execute("BEGIN TRANSACTION")
-    for name, path, anim_id in animation_entries:
-        asset_id = asset_id_map.get((name, path))
-        if asset_id:
-            cur.execute(
-                "INSERT OR IGNORE INTO asset_animations (asset_id, animation_id, frame_path_template) VALUES (?, ?, ?)",
-                (asset_id, anim_id, path)
-            )
+    cur.execute("CREATE TEMP TABLE tmp_anim (name TEXT, path TEXT, anim_id INTEGER)")
+    cur.executemany(INSERT_TMP_ANIM_SQL, animation_entries)
+    cur.execute("CREATE INDEX tmp_anim_np ON tmp_anim(name, path)")
+    cur.execute(LINK_ASSET_ANIMATIONS_SQL)
+    cur.execute("DROP TABLE tmp_anim")
     conn.execute("COMMIT")
     print("✅ Done scanning and inserting.")
 
 def main():
     conn, cur = init_db()
-    scan_assets(conn, cur)
-    conn.close()
+    try:
+        scan_assets(conn, cur)
+    except Exception:
+        # Journaling is off during the load, so a half-written transaction
+        # cannot be rolled back reliably
+        print(f"❌ Load failed; delete {DB_FILE} and rebuild it from scratch.")
+        raise
+    finally:
+        if not conn.in_transaction:
+            cur.executescript(RESTORE_PRAGMAS)
+        conn.close()
     print(f"✅ Database created: {DB_FILE}")
 
 if __name__ == "__main__":
@@ -2,20 +2,33 @@ import os
 import json
 import sqlite3
 
+try:
+    import orjson
+
+    def load_json(f):
+        return orjson.loads(f.read())
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    load_json = json.load
+
 DB_PATH = 'lpc_character_generator.sqlite'  # Adjust to your actual DB
 SHEET_DEF_DIR = 'sheet_definitions'
+STATEMENT_CACHE_SIZE = 256
 
-def parse_json_definitions(base_dir):
-    entries = []
+INSERT_CHARACTER_SQL = '''
+    INSERT OR IGNORE INTO character (type_name, gender, variant, z_index, path)
+    VALUES (?, ?, ?, ?, ?)
+'''
 
+def parse_json_definitions(base_dir):
+    """Lazily yield (type_name, gender, variant, z_index, path) rows, file by file."""
     for filename in os.listdir(base_dir):
         if not filename.endswith('.json'):
             continue
 
         filepath = os.path.join(base_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open(filepath, 'rb') as f:
             try:
-                data = json.load(f)
+                data = load_json(f)
             except Exception as e:
                 print(f"Failed to parse {filename}: {e}")
                 continue
@@ -24,27 +37,29 @@ def parse_json_definitions(base_dir):
         variants = data.get('variants', [])
         if not type_name:
             continue
+        # Rows are bound straight into one executemany, so anything sqlite3
+        # cannot bind has to be dropped here rather than failing the whole load
+        if not isinstance(type_name, str):
+            print(f"Skipping {filename}: type_name is not a string")
+            continue
 
         for key, val in data.items():
             if key.startswith("layer_") and isinstance(val, dict):
                 z_index = val.get('zPos', 0)
+                if not isinstance(z_index, (int, float)):
+                    print(f"Skipping {key} in {filename}: zPos is not a number")
+                    continue
                 for gender, path in val.items():
                     if gender == "zPos" or not isinstance(path, str):
                         continue  # skip non-string paths
                     for variant in variants or ["default"]:
+                        if not isinstance(variant, str):
+                            continue  # skip non-string variants
                         full_path = os.path.join(path, variant).replace("\\", "/")
-                        entries.append({
-                            'type_name': type_name,
-                            'gender': gender,
-                            'variant': variant,
-                            'z_index': z_index,
-                            'path': full_path
-                        })
-
-    return entries
+                        yield (type_name, gender, variant, z_index, full_path)
 
 def insert_into_database(entries, db_path):
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE)
     c = conn.cursor()
 
     c.execute('''
@@ -58,25 +73,19 @@ def insert_into_database(entries, db_path):
         )
     ''')
 
-    for e in entries:
-        try:
-            c.execute('''
-                INSERT OR IGNORE INTO character (type_name, gender, variant, z_index, path)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (e['type_name'], e['gender'], e['variant'], e['z_index'], e['path']))
-        except Exception as err:
-            print(f"Failed to insert entry {e['path']}: {err}")
+    # One transaction; OR IGNORE already skips duplicate paths. Entries are
+    # streamed from the parser, so the full set is never held in memory.
+    with conn:
+        c.executemany(INSERT_CHARACTER_SQL, entries)
+        inserted = c.rowcount
 
-    conn.commit()
     conn.close()
+    return inserted
 
 def main():
-    print("Parsing sprite definitions...")
-    entries = parse_json_definitions(SHEET_DEF_DIR)
-    print(f"Found {len(entries)} character layer entries.")
-
-    print("Inserting into SQLite...")
-    insert_into_database(entries, DB_PATH)
+    print("Parsing sprite definitions and inserting into SQLite...")
+    inserted = insert_into_database(parse_json_definitions(SHEET_DEF_DIR), DB_PATH)
+    print(f"Inserted {inserted} new character layer entries.")
     print("Done.")
 
 if __name__ == "__main__":
@@ -3,29 +3,50 @@ import os
 # Change this if needed
 ROOT_DIRS = ['spritesheets', 'sheets_definitions']
 OUTPUT_FILE = 'spritesheet_paths.txt'
+DIRS_OUTPUT_FILE = 'spritesheet_dirs.txt'
 
-def scan_directory_tree(root):
-    all_paths = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        for filename in filenames:
-            rel_path = os.path.join(dirpath, filename)
-            all_paths.append(os.path.normpath(rel_path))
-    return all_paths
+def iter_files(root):
+    """Recursively yield (path, name) for every file under root using os.scandir.
+
+    Entries are visited so that full paths come out in sorted order: a
+    directory sorts as "name/", matching where its children fall in a plain
+    sort of the complete paths.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = [(e.name + '/' if e.is_dir(follow_symlinks=False) else e.name, e) for e in it]
+    except OSError:
+        return  # skip unreadable or vanished directories, as os.walk does
+    for _, entry in sorted(entries, key=lambda pair: pair[0]):
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_files(entry.path)
+        elif entry.is_file():
+            yield entry.path, entry.name
 
 def main():
-    all_paths = []
-    for root in ROOT_DIRS:
-        if os.path.isdir(root):
-            print(f"Scanning {root}...")
-            all_paths.extend(scan_directory_tree(root))
-        else:
-            print(f"Warning: directory '{root}' not found. Skipping.")
+    path_count = 0
+    all_dirs = set()
 
+    # One traversal writes the path list as it goes and collects the
+    # (much smaller) set of directories that contain files
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        for path in sorted(all_paths):
+        for root in sorted(ROOT_DIRS):
+            if not os.path.isdir(root):
+                print(f"Warning: directory '{root}' not found. Skipping.")
+                continue
+            print(f"Scanning {root}...")
+            for path, _ in iter_files(root):
+                path = os.path.normpath(path)
+                f.write(path + '\n')
+                path_count += 1
+                all_dirs.add(os.path.dirname(path))
+
+    with open(DIRS_OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        for path in sorted(all_dirs):
             f.write(path + '\n')
 
-    print(f"\nDone. {len(all_paths)} paths written to '{OUTPUT_FILE}'.")
+    print(f"\nDone. {path_count} paths written to '{OUTPUT_FILE}'.")
+    print(f"{len(all_dirs)} directories written to '{DIRS_OUTPUT_FILE}'.")
 
 if __name__ == "__main__":
     main()
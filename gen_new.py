@@ -16,26 +16,42 @@ Usage:
 Requirements:
     - Python 3.6+
     - The sheet_definitions folder must be in the same directory as this script
+    - orjson (optional, speeds up JSON parsing)
 """
 
 import json
 import os
 import sqlite3
 import glob
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import re
 
+try:
+    import orjson
+
+    def load_json(f):
+        return orjson.loads(f.read())
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    load_json = json.load
+
 # Configuration
 SHEET_DEFINITIONS_DIR = "sheet_definitions"
 OUTPUT_SCHEMA_FILE = "lpc_spritesheet_schema.sql"
 OUTPUT_DB_FILE = "lpc_spritesheet.db"
 
-
-def sanitize_string(s):
-    """Sanitize a string for use in SQL statements"""
-    if s is None:
-        return None
-    return s.replace("'", "''")
+# Write-optimized settings for the initial bulk load, restored once it finishes
+BULK_LOAD_PRAGMAS = """
+PRAGMA journal_mode=OFF;
+PRAGMA synchronous=OFF;
+PRAGMA temp_store=MEMORY;
+PRAGMA locking_mode=EXCLUSIVE;
+"""
+RESTORE_PRAGMAS = """
+PRAGMA locking_mode=NORMAL;
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+"""
 
 
 def create_schema():
@@ -107,13 +123,13 @@ CREATE INDEX IF NOT EXISTS idx_files_sheet_id ON files(sheet_id);
 
 
 def process_json_files():
-    """Process all JSON files in the sheet_definitions directory and generate SQL INSERT statements"""
+    """Process all JSON files in the sheet_definitions directory and collect their rows"""
     if not os.path.isdir(SHEET_DEFINITIONS_DIR):
         print(f"Error: {SHEET_DEFINITIONS_DIR} directory not found!")
         return None
     
-    # List to store all insert statements
-    all_inserts = []
+    # List to store the rows of every sheet
+    all_sheets = []
     
     # Get list of JSON files
     json_files = glob.glob(os.path.join(SHEET_DEFINITIONS_DIR, "*.json"))
@@ -124,127 +140,149 @@ def process_json_files():
     
     print(f"Found {len(json_files)} JSON files in {SHEET_DEFINITIONS_DIR}")
     
-    # Process each JSON file
-    for file_path in json_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                file_inserts = process_single_json(data)
-                all_inserts.extend(file_inserts)
-        except json.JSONDecodeError:
-            print(f"Error: Could not parse JSON in {file_path}")
-        except Exception as e:
-            print(f"Error processing {file_path}: {str(e)}")
+    # Parse files in parallel; rows come back in file order for serial insertion
+    with ProcessPoolExecutor() as executor:
+        for sheet_rows, error in executor.map(parse_sheet_file, json_files, chunksize=8):
+            if error:
+                print(error)
+            else:
+                all_sheets.append(sheet_rows)
     
-    return all_inserts
+    return all_sheets
+
+
+def parse_sheet_file(file_path):
+    """Load and process a single JSON file in a worker process, returning (rows, error)"""
+    try:
+        with open(file_path, 'rb') as f:
+            return process_single_json(load_json(f)), None
+    except json.JSONDecodeError:
+        return None, f"Error: Could not parse JSON in {file_path}"
+    except Exception as e:
+        return None, f"Error processing {file_path}: {str(e)}"
 
 
 def process_single_json(data):
-    """Process a single JSON object and return SQL INSERT statements"""
-    inserts = []
+    """
+    Process a single JSON object and return its rows as plain tuples:
+    (sheet, layers, variants, animations), where sheet is
+    (name, type_name, match_body_color) and each layer is
+    (layer_name, z_position, [(path_type, path_value), ...])
+    """
+    # Values are validated here, in the worker, so that insert_sheet never fails
+    # halfway through a sheet. Bad scalars reject the whole file (reported by
+    # parse_sheet_file); non-string list entries and paths are skipped.
     
     # Extract basic sheet info
-    name = sanitize_string(data.get('name', ''))
-    type_name = sanitize_string(data.get('type_name', ''))
+    name = data.get('name', '')
+    type_name = data.get('type_name', '')
+    if not isinstance(name, str) or not isinstance(type_name, str):
+        raise ValueError("'name' and 'type_name' must be strings")
     match_body_color = 1 if data.get('match_body_color', False) else 0
-    
-    # Insert sheet and get its ID
-    sheet_insert = f"""
--- Start a new sheet: {name}
-INSERT INTO sheets (name, type_name, match_body_color)
-VALUES ('{name}', '{type_name}', {match_body_color});
-
--- Save the last inserted sheet_id for referencing in child tables
-"""
-    inserts.append(sheet_insert)
+    sheet = (name, type_name, match_body_color)
     
     # Process layers
-    for layer_name, layer_data in {k: v for k, v in data.items() if k.startswith('layer_')}.items():
-        if isinstance(layer_data, dict):
-            z_pos = layer_data.get('zPos', 0)
-            layer_insert = f"""
--- Insert layer: {layer_name}
-INSERT INTO layers (sheet_id, layer_name, z_position)
-VALUES ((SELECT MAX(sheet_id) FROM sheets), '{layer_name}', {z_pos});
-
--- Save the last inserted layer_id for layer paths
-"""
-            inserts.append(layer_insert)
-            
-            # Process layer paths
-            for path_type, path_value in {k: v for k, v in layer_data.items() if k != 'zPos'}.items():
-                path_value_safe = sanitize_string(path_value)
-                path_insert = f"""
-INSERT INTO layer_paths (layer_id, path_type, path_value)
-VALUES ((SELECT MAX(layer_id) FROM layers), '{path_type}', '{path_value_safe}');
-"""
-                inserts.append(path_insert)
+    layers = []
+    for layer_name, layer_data in data.items():
+        if not layer_name.startswith('layer_') or not isinstance(layer_data, dict):
+            continue
+        z_pos = layer_data.get('zPos', 0)
+        if not isinstance(z_pos, (int, float)):
+            raise ValueError(f"zPos of {layer_name} must be a number")
+        paths = []
+        for path_type, path_value in layer_data.items():
+            if path_type == 'zPos' or not isinstance(path_value, str):
+                continue  # skip non-string paths
+            paths.append((path_type, path_value))
+        layers.append((layer_name, z_pos, paths))
     
-    # Process variants
-    variants = data.get('variants', [])
-    for variant in variants:
-        variant_safe = sanitize_string(variant)
-        variant_insert = f"""
-INSERT INTO variants (sheet_id, variant_name)
-VALUES ((SELECT MAX(sheet_id) FROM sheets), '{variant_safe}');
-"""
-        inserts.append(variant_insert)
+    # Process variants and animations
+    variants = [(variant,) for variant in data.get('variants', []) if isinstance(variant, str)]
+    animations = [(animation,) for animation in data.get('animations', []) if isinstance(animation, str)]
     
-    # Process animations
-    animations = data.get('animations', [])
-    for animation in animations:
-        animation_safe = sanitize_string(animation)
-        animation_insert = f"""
-INSERT INTO animations (sheet_id, animation_name)
-VALUES ((SELECT MAX(sheet_id) FROM sheets), '{animation_safe}');
-"""
-        inserts.append(animation_insert)
+    return sheet, layers, variants, animations
+
+
+def insert_sheet(cursor, sheet_rows):
+    """Insert one sheet and its child rows, wiring ids through lastrowid"""
+    sheet, layers, variants, animations = sheet_rows
     
-    return inserts
-
-
-def create_database(schema, inserts):
-    """Create an SQLite database with the given schema and inserts"""
-    # First, create the schema file
-    with open(OUTPUT_SCHEMA_FILE, 'w', encoding='utf-8') as f:
-        f.write(schema)
-        if inserts:
-            f.write("\n-- Data insertion statements\n")
-            for insert in inserts:
-                f.write(insert)
+    cursor.execute("INSERT INTO sheets (name, type_name, match_body_color) VALUES (?, ?, ?)", sheet)
+    sheet_id = cursor.lastrowid
     
-    print(f"Schema and INSERT statements written to {OUTPUT_SCHEMA_FILE}")
+    for layer_name, z_pos, paths in layers:
+        cursor.execute(
+            "INSERT INTO layers (sheet_id, layer_name, z_position) VALUES (?, ?, ?)",
+            (sheet_id, layer_name, z_pos)
+        )
+        layer_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO layer_paths (layer_id, path_type, path_value) VALUES (?, ?, ?)",
+            [(layer_id, path_type, path_value) for path_type, path_value in paths]
+        )
     
-    # Now create the actual database
+    cursor.executemany(
+        "INSERT INTO variants (sheet_id, variant_name) VALUES (?, ?)",
+        [(sheet_id,) + variant for variant in variants]
+    )
+    cursor.executemany(
+        "INSERT INTO animations (sheet_id, animation_name) VALUES (?, ?)",
+        [(sheet_id,) + animation for animation in animations]
+    )
+
+
+def create_database(schema, sheets):
+    """Create an SQLite database with the given schema and sheet rows"""
     try:
         # Remove existing database if it exists
         if os.path.exists(OUTPUT_DB_FILE):
             os.remove(OUTPUT_DB_FILE)
         
-        # Create new database and connect
-        conn = sqlite3.connect(OUTPUT_DB_FILE)
+        # Create new database and connect in autocommit mode; the bulk load
+        # below manages its single transaction explicitly
+        conn = sqlite3.connect(OUTPUT_DB_FILE, isolation_level=None)
         cursor = conn.cursor()
         
-        # Execute schema
-        cursor.executescript(schema)
-        
-        # Execute inserts if available
-        if inserts:
-            # Process each file as a transaction
-            cursor.execute("BEGIN TRANSACTION;")
-            try:
-                for insert in inserts:
+        try:
+            cursor.executescript(BULK_LOAD_PRAGMAS)
+            
+            # Execute schema
+            cursor.executescript(schema)
+            
+            # Insert rows if available
+            if sheets:
+                cursor.execute("BEGIN TRANSACTION;")
+                for sheet_rows in sheets:
                     try:
-                        cursor.execute(insert)
+                        insert_sheet(cursor, sheet_rows)
                     except sqlite3.Error as e:
-                        print(f"Error executing: {insert}\nError: {str(e)}")
+                        print(f"Error inserting sheet: {sheet_rows[0][0]}\nError: {str(e)}")
                 cursor.execute("COMMIT;")
-            except sqlite3.Error:
-                cursor.execute("ROLLBACK;")
-                raise
+        except Exception:
+            # Journaling is off during the load, so ROLLBACK is undefined and
+            # could leave a corrupt file behind; discard it instead
+            conn.close()
+            os.remove(OUTPUT_DB_FILE)
+            raise
         
-        # Close connection
-        conn.close()
+        try:
+            # Write the schema file, followed by the data as INSERT statements
+            with open(OUTPUT_SCHEMA_FILE, 'w', encoding='utf-8') as f:
+                f.write(schema)
+                if sheets:
+                    f.write("\n-- Data insertion statements\n")
+                    dump = [line for line in conn.iterdump() if line.startswith("INSERT INTO")]
+                    # Parents before children so the file replays with foreign keys on
+                    for table in ("sheets", "layers", "layer_paths", "variants", "animations"):
+                        prefix = f'INSERT INTO "{table}" '
+                        for line in dump:
+                            if line.startswith(prefix):
+                                f.write(line + "\n")
+            
+            print(f"Schema and INSERT statements written to {OUTPUT_SCHEMA_FILE}")
+        finally:
+            cursor.executescript(RESTORE_PRAGMAS)
+            conn.close()
         
         print(f"Database created successfully at {OUTPUT_DB_FILE}")
         
@@ -267,55 +305,63 @@ def execute_statements_one_by_one(conn, statements):
                 conn.rollback()
 
 
+def iter_pngs(root):
+    """Lazily yield the path of every PNG file under root, skipping hidden entries like glob does"""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return  # skip unreadable or vanished directories, as glob does
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_pngs(entry.path)
+        elif entry.name.endswith('.png'):
+            yield entry.path
+
+
 def scan_image_files(repo_path, db_file):
     """
     Optional: Scan the actual repository for PNG files and add them to the database
     This is separate as it might take a long time with 200,000+ files
     """
     try:
-        conn = sqlite3.connect(db_file)
+        conn = sqlite3.connect(db_file, isolation_level=None)
         cursor = conn.cursor()
+        cursor.execute("BEGIN TRANSACTION;")
         
-        # Get all sheet types from the database
+        # Get all sheet types from the database; the last sheet of a type wins
         cursor.execute("SELECT sheet_id, type_name FROM sheets")
-        sheets = cursor.fetchall()
-        
-        sheet_types = {sheet[1]: sheet[0] for sheet in sheets}
+        sheet_types = {type_name: sheet_id for sheet_id, type_name in cursor.fetchall()}
         
         # Create a pattern to match sheet types in file paths
-        pattern = r'(?:' + '|'.join(re.escape(t) for t in sheet_types.keys()) + r')(?:/|$)'
+        pattern = re.compile(r'(?:' + '|'.join(re.escape(t) for t in sheet_types.keys()) + r')(?:/|$)')
         
-        # Find all PNG files
-        png_files = glob.glob(os.path.join(repo_path, "**/*.png"), recursive=True)
-        print(f"Found {len(png_files)} PNG files")
+        found = 0
         
-        # Process files in batches for better performance
-        batch_size = 1000
-        for i in range(0, len(png_files), batch_size):
-            batch = png_files[i:i+batch_size]
-            inserts = []
-            
-            for file_path in batch:
+        def sheet_files():
+            """Stream (sheet_id, rel_path) rows for PNGs that belong to a known sheet"""
+            nonlocal found
+            for file_path in iter_pngs(repo_path):
+                found += 1
                 # Get relative path for better storage
                 rel_path = os.path.relpath(file_path, repo_path)
                 
                 # Try to determine which sheet type this belongs to
-                match = re.search(pattern, rel_path)
+                match = pattern.search(rel_path)
                 if match:
-                    sheet_type = match.group(0).rstrip('/')
-                    sheet_id = sheet_types.get(sheet_type)
-                    
+                    sheet_id = sheet_types.get(match.group(0).rstrip('/'))
                     if sheet_id:
-                        inserts.append((sheet_id, rel_path))
-            
-            # Insert batch
-            if inserts:
-                cursor.executemany(
-                    "INSERT OR IGNORE INTO files (sheet_id, file_path) VALUES (?, ?)",
-                    inserts
-                )
-                conn.commit()
-                print(f"Processed {len(inserts)} files (batch {i//batch_size + 1})")
+                        yield sheet_id, rel_path
+        
+        cursor.executemany(
+            "INSERT OR IGNORE INTO files (sheet_id, file_path) VALUES (?, ?)",
+            sheet_files()
+        )
+        print(f"Found {found} PNG files")
+        print(f"Processed {cursor.rowcount} files")
+        cursor.execute("COMMIT;")
         
         conn.close()
         print("Finished scanning image files")
@@ -335,11 +381,11 @@ def main():
     schema = create_schema()
     
     # Process JSON files
-    inserts = process_json_files()
+    sheets = process_json_files()
     
     # Create database
-    if inserts:
-        create_database(schema, inserts)
+    if sheets:
+        create_database(schema, sheets)
         
         # Ask if user wants to scan actual image files (optional)
         scan_repo = input("Do you want to scan the actual repository for PNG files? (y/n) [n]: ").lower()